@@ -1,27 +1,181 @@
+import os
 import cv2
 import time
-from multiprocessing import Process, Queue, Event, set_start_method
+import queue
+import numpy as np
+from multiprocessing import Process, Event, Lock, RawArray, Semaphore, set_start_method
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+
+class SlotQueue:
+    """
+    FIFO of slot indices kept in a shared RawArray ring.
+    Unlike multiprocessing.Queue there is no feeder thread, pipe or pickling:
+    a put/get is one lock acquire plus a semaphore that lets get() block.
+    Mirrors the Queue put/get/get_nowait API and raises queue.Full/queue.Empty.
+    """
+
+    def __init__(self, capacity):
+        """
+        :param capacity: Max number of indices held at once
+        """
+        self.capacity = capacity
+        self._slots   = RawArray('i', capacity)
+        self._state   = RawArray('i', 2)  # head, count
+        self._lock    = Lock()
+        self._items   = Semaphore(0)
+
+    def put(self, idx):
+        """Append idx; never blocks (raises queue.Full if at capacity)."""
+        with self._lock:
+            head, count = self._state
+            if count == self.capacity:
+                raise queue.Full
+            self._slots[(head + count) % self.capacity] = idx
+            self._state[1] = count + 1
+        self._items.release()
+
+    put_nowait = put
+
+    def get(self, block=True, timeout=None):
+        """Pop the oldest idx, waiting up to timeout seconds if block is set."""
+        if not self._items.acquire(block, timeout):
+            raise queue.Empty
+        with self._lock:
+            head = self._state[0]
+            idx = self._slots[head]
+            self._state[0] = (head + 1) % self.capacity
+            self._state[1] -= 1
+        return idx
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+
+class FrameRing:
+    """
+    Fixed pool of shared-memory frame slots shared by producer and consumer.
+    A frame is copied once into a free slot; only the slot index travels
+    through a SlotQueue, so frames are never pickled.
+    Each slot starts with a small header (seq, h, w, c) followed by pixels;
+    c is 0 for single-channel (h, w) frames. A frame that cannot be stored
+    is passed on as a header-only slot with seq 0 (see mark_rejected).
+    """
+
+    HEADER_BYTES = 32  # 4 x uint64
+
+    def __init__(self, slots, max_shape):
+        """
+        :param slots:     Number of frame buffers in the ring
+        :param max_shape: Largest (h, w, c) uint8 frame a slot can hold
+        """
+        self.max_shape = tuple(max_shape)
+        self.capacity  = int(np.prod(self.max_shape))
+        self.segments  = [
+            shared_memory.SharedMemory(create=True, size=self.HEADER_BYTES + self.capacity)
+            for _ in range(slots)
+        ]
+
+        # slot indices owned by the producer / waiting for the consumer
+        self.free_slots  = SlotQueue(slots)
+        self.ready_slots = SlotQueue(slots)
+        for idx in range(slots):
+            self.free_slots.put(idx)
+
+        self._headers = None
+        self._pixels  = None
+
+    def __getstate__(self):
+        # numpy views are bound to this process' mapping; rebuild after unpickling
+        state = self.__dict__.copy()
+        state["_headers"] = None
+        state["_pixels"]  = None
+        return state
+
+    def _bind(self):
+        """Wrap every segment with numpy views (once per process)."""
+        if self._pixels is None:
+            self._headers = [np.ndarray((4,), np.uint64, buffer=shm.buf) for shm in self.segments]
+            self._pixels  = [
+                np.ndarray((self.capacity,), np.uint8, buffer=shm.buf, offset=self.HEADER_BYTES)
+                for shm in self.segments
+            ]
+
+    def write(self, idx, frame, seq):
+        """
+        Copy a frame into slot idx.
+        :return: False if the frame is not uint8 (h, w[, c]) or does not fit in a slot
+        """
+        if frame.dtype != np.uint8 or frame.ndim not in (2, 3) or frame.size > self.capacity:
+            return False
+        self._bind()
+        np.copyto(self._pixels[idx][:frame.size].reshape(frame.shape), frame)
+        h, w = frame.shape[:2]
+        self._headers[idx][:] = (seq, h, w, frame.shape[2] if frame.ndim == 3 else 0)
+        return True
+
+    def mark_rejected(self, idx, shape):
+        """Record in slot idx that a frame of this shape could not be stored."""
+        self._bind()
+        h, w = shape[:2]
+        self._headers[idx][:] = (0, h, w, shape[2] if len(shape) == 3 else 0)
+
+    def read(self, idx):
+        """
+        Zero-copy view of the frame in slot idx.
+        :return: (seq, frame view); seq is 0 and the view None for a rejected frame,
+                 whose shape is returned instead
+        """
+        self._bind()
+        seq, h, w, c = (int(v) for v in self._headers[idx])
+        shape = (h, w, c) if c else (h, w)
+        if seq == 0:
+            return 0, shape
+        return seq, self._pixels[idx][:h * w * max(c, 1)].reshape(shape)
+
+    def close(self, unlink=False):
+        """Drop this process' mapping; the owner also unlinks the segments."""
+        self._headers = None
+        self._pixels  = None
+        for shm in self.segments:
+            try:
+                shm.close()
+            except BufferError:
+                # a caller still holds a zero-copy view; the mapping dies with it
+                pass
+            if unlink:
+                try:
+                    shm.unlink()
+                except FileNotFoundError:
+                    pass
+
 
 class Camera:
     """
     Robust camera stream producer using multiprocessing.
-    Frames are pushed into a Queue. If full, the oldest frame is dropped.
+    Frames are written into a shared-memory FrameRing. If every slot is
+    queued, the oldest frame is dropped.
     Supports local devices and network streams (HTTP/RTSP) with automatic retry.
     """
 
-    def __init__(self, src=0, fps=1, queue_size=5):
+    def __init__(self, src=0, fps=1, queue_size=5, max_frame_shape=(1080, 1920, 3)):
         """
-        :param src:       OpenCV capture source (0 for webcam, URL for IP cam/RTSP)
-        :param fps:       Target frames per second
-        :param queue_size: Max number of frames to buffer
+        :param src:             OpenCV capture source (0 for webcam, URL for IP cam/RTSP)
+        :param fps:             Target frames per second
+        :param queue_size:      Max number of frames to buffer
+        :param max_frame_shape: Largest (h, w, c) frame the buffer can hold; larger
+                                frames make get_frame raise ValueError
         """
         self.src         = src
         self.fps         = fps
         self.queue_size  = queue_size
 
-        self.frame_queue = Queue(maxsize=queue_size)
+        self.frame_ring  = FrameRing(queue_size, max_frame_shape)
         self.stop_event  = Event()
         self.process     = None
+        self.last_seq    = None
+        self._held_slot  = None
 
     def start(self):
         """Spawn the camera process without upfront validation."""
@@ -34,17 +188,25 @@ class Camera:
         # Spawn the capture loop
         self.process = Process(
             target=self._capture_loop,
-            args=(self.frame_queue, self.stop_event, self.src, self.fps),
+            args=(self.frame_ring, self.stop_event, self.src, self.fps),
             daemon=True 
         )
         self.process.start()
 
-    def _capture_loop(self, frame_queue, stop_event, src, fps):
+    def _capture_loop(self, frame_ring, stop_event, src, fps):
         """
         Opens the source and reads frames. On failure it retries every second.
         """
         interval = 1.0 / fps
         cap = None
+        seq = 0
+
+        # Low-latency FFmpeg demuxing for RTSP, unless the user configured it
+        if isinstance(src, str) and src.lower().startswith("rtsp"):
+            os.environ.setdefault(
+                "OPENCV_FFMPEG_CAPTURE_OPTIONS",
+                "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay",
+            )
 
         try:
             while not stop_event.is_set():
@@ -55,32 +217,41 @@ class Camera:
                     cap = cv2.VideoCapture(src, cv2.CAP_FFMPEG)
                     if not cap.isOpened():
                         # couldn’t open yet—retry in a second
-                        time.sleep(1.0)
+                        stop_event.wait(timeout=1.0)
                         continue
+                    # keep only the newest frame so read() isn't frames behind
+                    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
                 # try to read a frame
+                end_time = time.time() + interval
                 ret, frame = cap.read()
                 if not ret or frame is None:
                     # connection may have dropped—reset and retry
                     cap.release()
                     cap = None
-                    time.sleep(1.0)
+                    stop_event.wait(timeout=1.0)
                     continue
 
-                # enqueue (dropping oldest if full)
-                if frame_queue.full():
+                # claim a slot (recycling the oldest queued frame if none are free)
+                try:
+                    idx = frame_ring.free_slots.get_nowait()
+                except queue.Empty:
                     try:
-                        frame_queue.get_nowait()
-                    except:
-                        pass
-                frame_queue.put(frame)
+                        idx = frame_ring.ready_slots.get_nowait()
+                    except queue.Empty:
+                        idx = None  # consumer holds every slot; skip this frame
 
-                # precise FPS pacing with quick stop checks
-                end_time = time.time() + interval
-                while time.time() < end_time:
-                    if stop_event.is_set():
-                        break
-                    time.sleep(0.01)
+                if idx is not None:
+                    seq += 1
+                    if not frame_ring.write(idx, frame, seq):
+                        # let the consumer know instead of silently dropping it
+                        frame_ring.mark_rejected(idx, frame.shape)
+                    frame_ring.ready_slots.put(idx)
+
+                # FPS pacing; wait() returns as soon as stop is requested
+                remaining = end_time - time.time()
+                if remaining > 0:
+                    stop_event.wait(timeout=remaining)
 
             if cap is not None:
                 cap.release()
@@ -91,18 +262,52 @@ class Camera:
         finally:
             if cap is not None:
                 cap.release()
+            frame_ring.close()
 
-    def get_frame(self, timeout=None):
+    def get_frame(self, timeout=None, copy=True):
         """
         Retrieve the next available frame.
         :param timeout: Seconds to wait (None = block indefinitely)
+        :param copy:    If False, return a zero-copy view into shared memory that
+                        stays valid until the next get_frame/stop call
         :return: cv2 image array, or None if queue empty / timed out
+        :raises ValueError: if the camera delivered a frame that the buffer cannot
+                            hold (larger than max_frame_shape, or not uint8)
         """
+        self._release_held_slot()
         try:
-            return self.frame_queue.get(timeout=timeout)
-        except:
+            idx = self.frame_ring.ready_slots.get(timeout=timeout)
+        except queue.Empty:
             return None
 
+        seq, frame = self.frame_ring.read(idx)
+        if seq == 0:
+            self.frame_ring.free_slots.put(idx)
+            raise ValueError(f"Camera frame of shape {frame} does not fit max_frame_shape "
+                             f"{self.frame_ring.max_shape} (uint8 frames only)")
+        self.last_seq = seq
+        if copy:
+            frame = frame.copy()
+            self.frame_ring.free_slots.put(idx)
+        else:
+            self._held_slot = idx
+        return frame
+
+    def _release_held_slot(self):
+        """Hand a slot lent out by get_frame(copy=False) back to the producer."""
+        if self._held_slot is not None:
+            self.frame_ring.free_slots.put(self._held_slot)
+            self._held_slot = None
+
+    @property
+    def sentinel(self):
+        """
+        Handle that becomes ready when the capture process exits (None before
+        start()). Can be passed to multiprocessing.connection.wait() together
+        with other handles to watch for camera death in an event loop.
+        """
+        return self.process.sentinel if self.process else None
+
     def stop(self, join_timeout=2):
         """
         Signal shutdown and wait for the process to exit.
@@ -110,8 +315,8 @@ class Camera:
         """
         self.stop_event.set()
         if self.process:
-            self.process.join(join_timeout)
-            if self.process.is_alive():
+            if not wait([self.process.sentinel], timeout=join_timeout):
                 self.process.terminate()
-                self.process.join()
-            
\ No newline at end of file
+            self.process.join()
+        self._release_held_slot()
+        self.frame_ring.close(unlink=True)
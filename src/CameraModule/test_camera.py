@@ -1,4 +1,5 @@
 import cv2
+from multiprocessing.connection import wait
 
 from camera_module import Camera
 
@@ -8,8 +9,16 @@ if __name__ == "__main__":
     try:
         cam.start()
         while True:
-            frame = cam.get_frame(timeout=1)
+            try:
+                frame = cam.get_frame(timeout=1)
+            except ValueError as e:
+                # frame larger than the buffer; raise max_frame_shape for this camera
+                print(f"Skipping frame: {e}")
+                continue
             if frame is None:
+                if wait([cam.sentinel], timeout=0):
+                    print("Camera process exited.")
+                    break
                 continue
             cv2.imshow("Feed", frame)
             if cv2.waitKey(1) & 0xFF == ord('q'):
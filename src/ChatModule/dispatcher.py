@@ -7,16 +7,32 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from datetime import datetime, timedelta
+import httpx
+
+try:
+    # C-implemented ISO 8601 parser; the stdlib one is used when it is missing
+    from ciso8601 import parse_datetime as parse_iso
+except ImportError:
+    parse_iso = datetime.fromisoformat
+
 import openai
 from openai import OpenAI
 
-# Initialize OpenAI client
+# Initialize OpenAI client once. Idle connections are kept for a couple of
+# minutes (httpx default: 5 s) so consecutive chat turns reuse the TLS session.
 openai.api_key = os.getenv("OPENAI_API_KEY")
-client = openai.OpenAI()
+client = openai.OpenAI(
+    http_client=openai.DefaultHttpxClient(
+        limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=120.0)
+    )
+)
 
 from MemoryModule.memory_module import MemoryModule
 from InferenceModule.inference_module import InferenceModule
 
+# Matches "my <label>" in user prompts (see extract_label)
+_LABEL_RE = re.compile(r"my (\w+)", re.IGNORECASE)
+
 # Define system instruction to guide function calling
 SYSTEM_MESSAGE = {
     "role": "system",
@@ -98,7 +114,7 @@ def dispatch_function(name: str, args: dict):
             if t.endswith('Z'):
                 t = t[:-1]
             # Parse into datetime (handles fractional seconds)
-            args[key] = datetime.fromisoformat(t)
+            args[key] = parse_iso(t)
 
     if name == "get_history":
         return inf.get_history(**args)
@@ -135,8 +151,8 @@ def extract_label(prompt: str) -> str:
     """
     Heuristic to extract the object label from user prompt, e.g. 'my laptop'.
     """
-    m = re.search(r"my (\w+)", prompt.lower())
-    return m.group(1) if m else prompt.strip().split()[-1].rstrip('?.')
+    m = _LABEL_RE.search(prompt)
+    return m.group(1).lower() if m else prompt.rstrip().rsplit(None, 1)[-1].rstrip('?.')
 
 
 def chat_with_bot(user_prompt: str) -> str:
@@ -0,0 +1,107 @@
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:  # numba is optional; callers fall back to NumPy/scikit-learn
+    HAVE_NUMBA = False
+    prange = range
+
+
+def jit(**options):
+    """numba.njit(**options) when numba is installed, otherwise a no-op decorator."""
+    if HAVE_NUMBA:
+        return njit(**options)
+    return lambda fn: fn
+
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_HOUR = 3600 * NS_PER_SECOND
+
+
+@jit(cache=True, fastmath=True)
+def nearest_zone(lat, lon, zlat, zlon, zcos, zrad2):
+    """
+    Index of the nearest zone containing the point (lat, lon), or -1 if none
+    does. Uses the equirectangular approximation; all angles are in radians.
+    """
+    best = -1
+    best_d = 0.0
+    for k in range(zlat.shape[0]):
+        dlat = lat - zlat[k]
+        dlon = (lon - zlon[k]) * zcos[k]
+        d = dlat*dlat + dlon*dlon
+        if d <= zrad2[k] and (best < 0 or d < best_d):
+            best = k
+            best_d = d
+    return best
+
+
+@jit(cache=True, fastmath=True, parallel=True)
+def assign_zones(lat, lon, zlat, zlon, zcos, zrad2):
+    """
+    nearest_zone() for every point.
+
+    :param lat, lon:   (N,) point coordinates in radians
+    :param zlat, zlon: (K,) zone centers in radians
+    :param zcos:       (K,) cos(zlat)
+    :param zrad2:      (K,) squared zone radius in radians
+    :return: (N,) int64 zone indices, -1 where no zone contains the point
+    """
+    n = lat.shape[0]
+    out = np.empty(n, np.int64)
+    for i in prange(n):
+        out[i] = nearest_zone(lat[i], lon[i], zlat, zlon, zcos, zrad2)
+    return out
+
+
+@jit(cache=True, fastmath=True)
+def zone_hour_histogram(lat, lon, ts_ns, zlat, zlon, zcos, zrad2,
+                        lat0, lon0, cos_lat0, cx, cy, cluster_r2, radius_m, out, first):
+    """
+    Assign every sighting to a zone and count it into out[zone, hour] in a
+    single pass, without materializing per-point zone indices or distances.
+    Rows of out are the manual zones, then the auto clusters, then "unknown".
+    A point goes to the nearest manual zone containing it, otherwise to the
+    nearest cluster centroid if that is within the cluster radius.
+
+    :param lat, lon:           (N,) point coordinates in degrees
+    :param ts_ns:              (N,) int64 timestamps in nanoseconds
+    :param zlat, zlon:         (K,) manual zone centers in radians
+    :param zcos:               (K,) cos(zlat)
+    :param zrad2:              (K,) squared zone radius in radians
+    :param lat0, lon0:         projection origin in degrees
+    :param cos_lat0:           cos(lat0)
+    :param cx, cy:             (C,) projected cluster centroids in meters
+    :param cluster_r2:         squared cluster radius in meters
+    :param radius_m:           earth radius in meters
+    :param out:                (K + C + 1, 24) histogram, incremented in place
+    :param first:              same shape as out; index of the first point counted
+                               into each still-empty cell is written here
+    """
+    deg2rad = np.pi / 180.0
+    n_zones = zlat.shape[0]
+    n_clusters = cx.shape[0]
+    unknown = n_zones + n_clusters
+    for i in range(lat.shape[0]):
+        best = nearest_zone(lat[i] * deg2rad, lon[i] * deg2rad, zlat, zlon, zcos, zrad2)
+        if best < 0:
+            best = unknown
+            if n_clusters:
+                x = (lon[i] - lon0) * deg2rad * cos_lat0 * radius_m
+                y = (lat[i] - lat0) * deg2rad * radius_m
+                nearest = 0
+                nearest_d = np.inf
+                for c in range(n_clusters):
+                    dx = x - cx[c]
+                    dy = y - cy[c]
+                    d = dx*dx + dy*dy
+                    if d < nearest_d:
+                        nearest = c
+                        nearest_d = d
+                if nearest_d <= cluster_r2:
+                    best = n_zones + nearest
+        h = (ts_ns[i] // NS_PER_HOUR) % 24
+        if out[best, h] == 0:
+            first[best, h] = i
+        out[best, h] += 1
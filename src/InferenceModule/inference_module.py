@@ -4,13 +4,20 @@ from datetime import datetime
 
 import numpy as np
 from sklearn.cluster import DBSCAN
+from sklearn.metrics.pairwise import haversine_distances
+from sklearn.neighbors import KDTree
 
-from MemoryModule.memory_module import MemoryModule
+from InferenceModule._kernels import (
+    HAVE_NUMBA, NS_PER_HOUR, NS_PER_SECOND, assign_zones, zone_hour_histogram
+)
+from MemoryModule.memory_module import MemoryModule, datetime_to_ns
 
 
 # Earth radius in meters
 EARTH_RADIUS_M = 6371000.0
 
+# Below this radius the equirectangular/small-angle distance is off by < 1 m
+SMALL_ANGLE_MAX_RADIUS_M = 10_000.0
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
@@ -23,6 +30,20 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
 
 
+def haversine_matrix(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Pairwise haversine distances in meters between N points (lat1, lon1)
+    and M points (lat2, lon2), as an N x M matrix.
+    """
+    if len(lat1) == 0 or len(lat2) == 0:
+        # haversine_distances rejects empty inputs
+        return np.empty((len(lat1), len(lat2)))
+    a = np.radians(np.column_stack((lat1, lon1)))
+    b = np.radians(np.column_stack((lat2, lon2)))
+    return haversine_distances(a, b) * EARTH_RADIUS_M
+
+
+
 class Place:
     def __init__(self, name: str, center: Tuple[float, float], radius_m: float = 3.0):
         """
@@ -34,13 +55,46 @@ class Place:
         self.name = name
         self.center = center
         self.radius_m = radius_m
+        # Center terms for the equirectangular distance test, computed once
+        self._lat_rad = math.radians(center[0])
+        self._lon_rad = math.radians(center[1])
+        self._cos_lat = math.cos(self._lat_rad)
+        self._radius_rad = radius_m / EARTH_RADIUS_M
 
     def contains(self, lat: float, lon: float) -> bool:
         """
         Check if a point (lat, lon) falls within this zone.
+        Uses the equirectangular approximation, which at zone-sized radii is
+        within millimeters of the haversine distance, and compares squared
+        angular distances to skip the square root. Zones of
+        SMALL_ANGLE_MAX_RADIUS_M or more use the full haversine distance.
+
+        Public helper for single-zone checks. ZoneModel applies the same test
+        to all zones at once in assign_many, where a point inside several
+        zones goes to the nearest one.
         """
-        dist = haversine_distance(lat, lon, self.center[0], self.center[1])
-        return dist <= self.radius_m
+        if self.radius_m >= SMALL_ANGLE_MAX_RADIUS_M:
+            return haversine_distance(lat, lon, self.center[0], self.center[1]) <= self.radius_m
+        dlat = math.radians(lat) - self._lat_rad
+        dlon = (math.radians(lon) - self._lon_rad) * self._cos_lat
+        return dlat*dlat + dlon*dlon <= self._radius_rad*self._radius_rad
+
+
+def zone_array(places: List[Place]) -> np.ndarray:
+    """
+    Pack manual zones into one structured array, so distance code reads
+    contiguous columns (zarr['lat'], zarr['rad2_rad'], ...) instead of
+    per-object attributes. Angles are stored in both degrees and radians.
+    """
+    width = max((len(place.name) for place in places), default=1)
+    zarr = np.zeros(len(places), dtype=[
+        ('lat', 'f8'), ('lon', 'f8'), ('lat_rad', 'f8'), ('lon_rad', 'f8'),
+        ('cos_lat', 'f8'), ('rad_m', 'f8'), ('rad2_rad', 'f8'), ('name', f'U{width}'),
+    ])
+    for i, place in enumerate(places):
+        zarr[i] = (place.center[0], place.center[1], place._lat_rad, place._lon_rad,
+                   place._cos_lat, place.radius_m, place._radius_rad ** 2, place.name)
+    return zarr
 
 
 class ZoneModel:
@@ -53,58 +107,167 @@ class ZoneModel:
         cluster_radius_m: float = 3.0
     ):
         self.manual_zones = manual_zones or []
+        self._zone_arr = zone_array(self.manual_zones)
         self.cluster_radius_m = cluster_radius_m
         self._auto_centroids: Dict[str, Tuple[float, float]] = {}
+        # Centroid names, their projected positions and a KDTree over them (same order)
+        self._auto_labels: List[str] = []
+        self._auto_xy = np.empty((0, 2))
+        self._auto_tree: Optional[KDTree] = None
+        # Reference point of the local equirectangular projection
+        self._origin: Tuple[float, float] = (0.0, 0.0)
+        self._cos_lat0 = 1.0
 
-    def fit(self, points: List[Tuple[float, float]]):
+    def add_zone(self, place: Place):
+        """Add a manual zone and repack the zone array."""
+        self.manual_zones.append(place)
+        self._zone_arr = zone_array(self.manual_zones)
+
+    def _zone_columns(self, *fields: str) -> List[np.ndarray]:
+        """Contiguous copies of zone array columns, for the numba kernels."""
+        return [np.ascontiguousarray(self._zone_arr[field]) for field in fields]
+
+    def _project(self, lats, lons) -> np.ndarray:
+        """
+        Equirectangular projection of (lat, lon) degrees to (x, y) meters around
+        the fitted origin. Accurate to well under a meter at household scale.
         """
-        Cluster GPS points into automatic zones using DBSCAN with haversine.
+        lat0, lon0 = self._origin
+        x = np.radians(np.subtract(lons, lon0)) * self._cos_lat0 * EARTH_RADIUS_M
+        y = np.radians(np.subtract(lats, lat0)) * EARTH_RADIUS_M
+        return np.column_stack((x, y))
 
-        :param points: List of (lat, lon)
+    def fit(self, points):
         """
-        if not points:
+        Cluster GPS points into automatic zones using DBSCAN on a local
+        equirectangular projection (meters), which lets it use a KD-tree.
+
+        :param points: List of (lat, lon) or an N x 2 array
+        """
+        if len(points) == 0:
             return
-        # Convert to radians for haversine metric
-        coords = np.radians(np.array(points))
-        # eps in radians
-        eps = self.cluster_radius_m / EARTH_RADIUS_M
-        db = DBSCAN(eps=eps, min_samples=1, metric='haversine')
+        latlon = np.array(points, dtype=float)
+        # Project around the mean position so eps is simply in meters
+        lat0, lon0 = latlon.mean(axis=0)
+        self._origin = (float(lat0), float(lon0))
+        self._cos_lat0 = math.cos(math.radians(lat0))
+        coords = self._project(latlon[:, 0], latlon[:, 1])
+        db = DBSCAN(eps=self.cluster_radius_m, min_samples=1, algorithm='kd_tree')
         labels = db.fit_predict(coords)
 
-        # Compute centroids per cluster
-        clusters: Dict[int, List[Tuple[float, float]]] = {}
-        for lbl, (lat, lon) in zip(labels, points):
-            clusters.setdefault(lbl, []).append((lat, lon))
+        # Compute centroids per cluster (min_samples=1, so there is no noise label)
+        n = labels.max() + 1
+        counts = np.bincount(labels, minlength=n)
+        clat = np.bincount(labels, weights=latlon[:, 0], minlength=n) / counts
+        clon = np.bincount(labels, weights=latlon[:, 1], minlength=n) / counts
         self._auto_centroids = {
-            f"cluster_{lbl}": (
-                float(np.mean([p[0] for p in pts])),
-                float(np.mean([p[1] for p in pts]))
-            )
-            for lbl, pts in clusters.items()
+            f"cluster_{i}": (float(clat[i]), float(clon[i])) for i in range(n)
         }
+        self._auto_labels = list(self._auto_centroids)
+        self._auto_xy = self._project(clat, clon)
+        self._auto_tree = KDTree(self._auto_xy)
 
     def assign(self, lat: float, lon: float) -> str:
         """
         Assign a (lat, lon) to a manual zone or an automatic cluster.
+        Same rules as assign_many: the nearest manual zone containing the
+        point, else the nearest auto-centroid within radius, else "unknown".
 
         :return: zone name or cluster_id
         """
-        # Check manual zones first
-        for zone in self.manual_zones:
-            if zone.contains(lat, lon):
-                return zone.name
-        # Fallback: find nearest auto-centroid within radius
-        best_label = None
-        best_dist = float('inf')
-        for label, (clat, clon) in self._auto_centroids.items():
-            dist = haversine_distance(lat, lon, clat, clon)
-            if dist < best_dist:
-                best_dist = dist
-                best_label = label
-        if best_label and best_dist <= self.cluster_radius_m:
-            return best_label
-        # If too far from any cluster, mark unknown
-        return "unknown"
+        idx = self.assign_many(np.array([lat], dtype=float), np.array([lon], dtype=float))[0]
+        return self.zone_names[idx]
+
+    @property
+    def zone_names(self) -> List[str]:
+        """Manual zone names, then auto clusters, then "unknown"."""
+        return self._zone_arr['name'].tolist() + self._auto_labels + ["unknown"]
+
+    def assign_many(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """
+        Assign many points at once. A point inside several manual zones goes
+        to the nearest one.
+
+        :param lats: Array of latitudes
+        :param lons: Array of longitudes
+        :return: Index into zone_names for every point
+        """
+        zarr = self._zone_arr
+        n_manual = len(zarr)
+        zone_idx = np.full(len(lats), n_manual + len(self._auto_labels), dtype=np.intp)
+        pending = np.ones(len(lats), dtype=bool)
+
+        if n_manual:
+            if HAVE_NUMBA and zarr['rad_m'].max() < SMALL_ANGLE_MAX_RADIUS_M:
+                # Fused distance + argmin kernel, no N x K matrix
+                nearest = assign_zones(np.radians(lats), np.radians(lons),
+                                       *self._zone_columns('lat_rad', 'lon_rad', 'cos_lat', 'rad2_rad'))
+                hit = nearest >= 0
+            else:
+                dists = haversine_matrix(lats, lons, zarr['lat'], zarr['lon'])
+                dists[dists > zarr['rad_m']] = np.inf
+                nearest = dists.argmin(axis=1)
+                hit = np.isfinite(dists[np.arange(len(dists)), nearest])
+            zone_idx[hit] = nearest[hit]
+            pending = ~hit
+
+        if self._auto_labels and pending.any():
+            rows = np.flatnonzero(pending)
+            dist, nearest = self._auto_tree.query(self._project(lats[rows], lons[rows]), k=1)
+            hit = dist[:, 0] <= self.cluster_radius_m
+            zone_idx[rows[hit]] = n_manual + nearest[hit, 0]
+
+        return zone_idx
+
+    def hour_histogram(
+        self,
+        lats: np.ndarray,
+        lons: np.ndarray,
+        ts_ns: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Zone x hour-of-day sighting counts, rows ordered as zone_names.
+        With numba, assignment and binning are fused into one pass over the
+        points; otherwise assign_many feeds a single bincount.
+
+        :param lats:  Array of latitudes
+        :param lons:  Array of longitudes
+        :param ts_ns: int64 timestamps in nanoseconds
+        :return: (counts, first), both (len(zone_names), 24) int64; first holds
+                 the index of the earliest point in each cell (len(lats) if empty)
+        """
+        zarr = self._zone_arr
+        n_zones = len(zarr) + len(self._auto_labels) + 1
+        first = np.full((n_zones, 24), len(lats), dtype=np.int64)
+        if HAVE_NUMBA and (not len(zarr) or zarr['rad_m'].max() < SMALL_ANGLE_MAX_RADIUS_M):
+            counts = np.zeros((n_zones, 24), dtype=np.int64)
+            # Contiguous writable copies, so the kernel compiles for one array layout
+            # whatever views the caller passes in
+            zone_hour_histogram(
+                np.array(lats, dtype=np.float64), np.array(lons, dtype=np.float64),
+                np.array(ts_ns, dtype=np.int64),
+                *self._zone_columns('lat_rad', 'lon_rad', 'cos_lat', 'rad2_rad'),
+                self._origin[0], self._origin[1], self._cos_lat0,
+                np.ascontiguousarray(self._auto_xy[:, 0]), np.ascontiguousarray(self._auto_xy[:, 1]),
+                self.cluster_radius_m ** 2, EARTH_RADIUS_M, counts, first)
+            return counts, first
+        hours = (ts_ns // NS_PER_HOUR) % 24
+        zone_idx = self.assign_many(lats, lons)
+        # one bincount over the flattened (zone, hour) index
+        cells = zone_idx * 24 + hours
+        counts = np.bincount(cells, minlength=n_zones * 24).reshape(n_zones, 24)
+        used, first_idx = np.unique(cells, return_index=True)
+        first.flat[used] = first_idx
+        return counts, first
+
+
+if HAVE_NUMBA:
+    # Warm the zone kernels through the real call path, so they compile for
+    # the same argument types as later calls
+    _warm = ZoneModel([Place("warmup", (0.0, 0.0), 1.0)])
+    _warm.assign_many(np.zeros(1), np.zeros(1))
+    _warm.hour_histogram(np.zeros(1), np.zeros(1), np.zeros(1, dtype=np.int64))
+    del _warm
 
 
 class TimeModel:
@@ -116,6 +279,12 @@ class TimeModel:
         self.probs: Dict[int, Dict[str, float]] = {}
         # zone -> centroid (lat, lon)
         self.centroids: Dict[str, Tuple[float, float]] = {}
+        # hour -> row in zone_names of the most seen zone (-1 if no data), and its count
+        self.best_idx = np.full(24, -1, dtype=np.int64)
+        self.best_count = np.zeros(24, dtype=np.int64)
+        self.zone_names: List[str] = []
+        # MemoryModule.version() of the data this model was trained on
+        self.version: Optional[Tuple[int, int]] = None
 
 
 class InferenceModule:
@@ -133,36 +302,79 @@ class InferenceModule:
 
     def define_zone(self, place: Place):
         """Add a manual zone."""
-        self.zoner.manual_zones.append(place)
+        self.zoner.add_zone(place)
+        # zones changed: every model must be retrained
+        self._time_models.clear()
 
     def train_time_model(self, label: str) -> None:
         """
         Build clustering and P(being in zone | hour) from memory logs.
+        No-op if the label's sightings are unchanged since the last training.
         """
-        events = self.mem.get_sightings(label)
-        points = [(ev['location'][0], ev['location'][1]) for ev in events]
+        version = self.mem.version(label)
+        model = self._time_models.get(label)
+        if model is not None and model.version == version:
+            return
+        lats, lons, ts_ns = self.mem.get_arrays(label)
         # Cluster points
-        self.zoner.fit(points)
-        # Prepare count structure: hour -> zone -> count
-        counts: Dict[int, Dict[str, int]] = {h: {} for h in range(24)}
-        for ev in events:
-            hour = ev['timestamp'].hour
-            zone = self.zoner.assign(ev['location'][0], ev['location'][1])
-            counts[hour][zone] = counts[hour].get(zone, 0) + 1
-            # store centroids
+        self.zoner.fit(np.column_stack((lats, lons)))
+        # Assign every sighting and build the zone x hour histogram
+        zone_names = self.zoner.zone_names
+        counts, first = self.zoner.hour_histogram(lats, lons, ts_ns)
+        totals = counts.sum(axis=0)
+
         model = TimeModel()
+        model.version = version
+        # Most seen zone per hour; on a tie the zone seen earliest in that hour wins
+        n = len(ts_ns)
+        best = (counts * (n + 1) + (n - first)).argmax(axis=0)
+        model.best_count = counts[best, np.arange(24)]
+        model.best_idx = np.where(totals > 0, best, -1)
+        model.zone_names = zone_names
         model.centroids = {**{zone.name: zone.center for zone in self.zoner.manual_zones},
                            **self.zoner._auto_centroids}
         # Normalize to probabilities
-        for hour, zone_counts in counts.items():
-            total = sum(zone_counts.values())
+        for hour in range(24):
+            total = totals[hour]
             prob_dict: Dict[str, float] = {}
             if total > 0:
-                for zone, cnt in zone_counts.items():
-                    prob_dict[zone] = cnt / total
+                for j in sorted(np.flatnonzero(counts[:, hour]), key=first[:, hour].__getitem__):
+                    zone = zone_names[j]
+                    prob_dict[zone] = prob_dict.get(zone, 0.0) + float(counts[j, hour] / total)
             model.probs[hour] = prob_dict
         self._time_models[label] = model
 
+    @staticmethod
+    def _now_ns() -> int:
+        """Current time on the same clock as stored sighting timestamps."""
+        return datetime_to_ns(datetime.now())
+
+    def _is_fresh(self, ts_ns: np.ndarray, now_ns):
+        """
+        Whether the latest sighting in ts_ns (sorted) falls within the
+        freshness window before now_ns. Works for a scalar or an array of times.
+        """
+        cutoff = np.asarray(now_ns) - self.freshness * NS_PER_SECOND
+        if not len(ts_ns):
+            return np.zeros(cutoff.shape, dtype=bool)
+        return ts_ns[-1] >= cutoff
+
+    def _get_model(self, label: str) -> TimeModel:
+        """Return the time model for label, training it first if it is stale."""
+        self.train_time_model(label)
+        return self._time_models[label]
+
+    def _predict_core(self, label: str, hour: int) -> Tuple[int, int]:
+        """
+        Numeric core of the time-model prediction.
+
+        :return: (row into the model's zone_names, sightings in that zone at hour),
+                 or (-1, 0) when there is no data for hour
+        """
+        model = self._get_model(label)
+        zone_idx = int(model.best_idx[hour])
+        return (zone_idx, int(model.best_count[hour])) if zone_idx >= 0 else (-1, 0)
+
     def get_history(
         self,
         label: str,
@@ -170,10 +382,7 @@ class InferenceModule:
         until: Optional[datetime] = None
     ) -> List[Dict]:
         """Return raw sighting events from memory."""
-        events = self.mem.get_sightings(label, since)
-        if until:
-            events = [ev for ev in events if ev['timestamp'] <= until]
-        return events
+        return self.mem.get_sightings(label, since, until)
 
     def last_seen(self, label: str) -> Optional[Dict]:
         """Return the most recent sighting."""
@@ -187,27 +396,56 @@ class InferenceModule:
         """
         Return a (lat, lon) estimate for label at at_time.
         """
-        now = at_time or datetime.now()
-        last = self.last_seen(label)
-        if last:
-            age = (now - last['timestamp']).total_seconds()
-            if age <= self.freshness:
-                return last['location']
-        # Otherwise, use time model
-        if label not in self._time_models:
-            self.train_time_model(label)
+        now_ns = datetime_to_ns(at_time) if at_time else self._now_ns()
+        lats, lons, ts_ns = self.mem.get_arrays(label)
+        if self._is_fresh(ts_ns, now_ns):
+            # seen within the freshness window: return the latest sighting
+            return (float(lats[-1]), float(lons[-1]))
+        # Otherwise, use time model: zone with the most sightings at this hour
+        zone_idx, _ = self._predict_core(label, int(now_ns // NS_PER_HOUR) % 24)
         model = self._time_models[label]
-        hour = now.hour
-        probs = model.probs.get(hour, {})
-        if not probs:
+        if zone_idx < 0:
             # fallback: use centroid of last seen or first centroid
-            if last:
-                return last['location']
+            if len(ts_ns):
+                return (float(lats[-1]), float(lons[-1]))
             # any centroid
             return next(iter(model.centroids.values()))
-        # pick zone with max probability
-        zone = max(probs, key=probs.get)
-        return model.centroids.get(zone, list(model.centroids.values())[0])
+        return model.centroids.get(model.zone_names[zone_idx], list(model.centroids.values())[0])
+
+    def predict_many(
+        self,
+        label: str,
+        at_times: List[datetime]
+    ) -> List[Tuple[float, float]]:
+        """
+        Vectorized predict_location over several query times for one label.
+        The model is fetched once and all hours are looked up with one gather.
+        """
+        if not at_times:
+            return []
+        times_ns = np.array([datetime_to_ns(t) for t in at_times], dtype=np.int64)
+        lats, lons, ts_ns = self.mem.get_arrays(label)
+        fresh = self._is_fresh(ts_ns, times_ns)
+        if fresh.all():
+            return [(float(lats[-1]), float(lons[-1]))] * len(times_ns)
+
+        model = self._get_model(label)
+        hours = (times_ns // NS_PER_HOUR) % 24
+        best = model.best_idx[hours]
+
+        locs: List[Tuple[float, float]] = []
+        for i in range(len(times_ns)):
+            if fresh[i] or best[i] < 0:
+                # fresh sighting, or no data for the hour: last seen location
+                if len(ts_ns):
+                    locs.append((float(lats[-1]), float(lons[-1])))
+                else:
+                    # any centroid (StopIteration if there are none, as in predict_location)
+                    locs.append(next(iter(model.centroids.values())))
+            else:
+                locs.append(model.centroids.get(model.zone_names[best[i]],
+                                                list(model.centroids.values())[0]))
+        return locs
 
     def explain_prediction(
         self,
@@ -217,20 +455,21 @@ class InferenceModule:
         """
         Generate a human-readable rationale for predict_location.
         """
-        now = at_time or datetime.now()
-        last = self.last_seen(label)
-        if last and (now - last['timestamp']).total_seconds() <= self.freshness:
-            return (f"Your {label} was seen {int((now - last['timestamp']).total_seconds())} seconds ago "
-                    f"at location {last['location']}. Returning that location.")
-        if label not in self._time_models:
-            self.train_time_model(label)
-        model = self._time_models[label]
-        hour = now.hour
-        probs = model.probs.get(hour, {})
-        if not probs:
+        now_ns = datetime_to_ns(at_time) if at_time else self._now_ns()
+        lats, lons, ts_ns = self.mem.get_arrays(label)
+        if self._is_fresh(ts_ns, now_ns):
+            age = int((now_ns - int(ts_ns[-1])) / NS_PER_SECOND)
+            location = (float(lats[-1]), float(lons[-1]))
+            return (f"Your {label} was seen {age} seconds ago "
+                    f"at location {location}. Returning that location.")
+        hour = int(now_ns // NS_PER_HOUR) % 24
+        zone_idx, count = self._predict_core(label, hour)
+        if zone_idx < 0:
             return f"No data for hour {hour}. Unable to infer {label} location."
-        zone = max(probs, key=probs.get)
-        p = probs[zone] * 100
+        model = self._time_models[label]
+        zone = model.zone_names[zone_idx]
+        p = model.probs[hour][zone] * 100
         centroid = model.centroids[zone]
+        seen = f"{count} sighting" + ("" if count == 1 else "s")
         return (f"No recent sightings. Between hour {hour} and {hour+1}, your {label} was in '{zone}' "
-                f"{p:.1f}% of the time (centroid at {centroid}).")
+                f"{p:.1f}% of the time ({seen}, centroid at {centroid}).")
@@ -1,60 +1,211 @@
 import os
 import threading
+import weakref
 import csv
+import struct
 from pathlib import Path
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, BinaryIO, Union
 import datetime
 
 import cv2
 import numpy as np
 
 
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+# On-disk sighting record (44 bytes, little-endian, no padding)
+REC_DTYPE = np.dtype([
+    ("ts", "<i8"),            # ns since epoch
+    ("track_id", "<i4"),
+    ("bbox", "<i4", (4,)),    # x, y, w, h
+    ("loc", "<f8", (2,)),     # lat, lon
+])
+_REC_STRUCT = struct.Struct("<qiiiiidd")
+assert _REC_STRUCT.size == REC_DTYPE.itemsize
+
+# Write buffer per open log; a full buffer is written out even between flushes
+_LOG_BUFFER_BYTES = 1 << 20
+
+
+def datetime_to_ns(ts: datetime.datetime) -> int:
+    """Nanoseconds since 1970-01-01 on the timestamp's own clock (aware values as UTC)."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (ts - _EPOCH) // datetime.timedelta(microseconds=1) * 1000
+
+
+def ns_to_datetime(ns: int) -> datetime.datetime:
+    """Inverse of datetime_to_ns (naive datetime, microsecond precision)."""
+    return _EPOCH + datetime.timedelta(microseconds=int(ns) // 1000)
+
+
+def _close_handles(handles: Dict[str, BinaryIO]) -> None:
+    """Flush and close every log handle in place."""
+    for f in handles.values():
+        f.close()
+    handles.clear()
+
+
+class _LabelColumns:
+    """
+    Struct-of-arrays store for the sightings of one label.
+    Columns grow by doubling; only the first `n` rows are valid.
+    Rows are kept sorted by timestamp so time filters can binary-search.
+    """
+
+    _FIELDS = ("ts", "track_id", "bbox", "loc")
+
+    def __init__(self, capacity: int = 64):
+        self.n = 0
+        self.ts = np.empty(capacity, dtype=np.int64)            # ns since epoch
+        self.track_id = np.empty(capacity, dtype=np.int32)
+        self.bbox = np.empty((capacity, 4), dtype=np.int32)     # x, y, w, h
+        self.loc = np.empty((capacity, 2), dtype=np.float64)    # lat, lon
+
+    @classmethod
+    def from_records(cls, records: np.ndarray) -> "_LabelColumns":
+        """Build columns from a REC_DTYPE array in one vectorized copy."""
+        order = np.argsort(records["ts"], kind="stable")
+        cols = cls(max(64, len(records)))
+        cols.n = len(records)
+        for name in cls._FIELDS:
+            getattr(cols, name)[:cols.n] = records[name][order]
+        return cols
+
+    def append(self, ts_ns: int, track_id: int, bbox: Tuple, loc: Tuple) -> None:
+        if self.n == len(self.ts):
+            self._grow(2 * len(self.ts))
+        i = self.n
+        if i and ts_ns < self.ts[i - 1]:
+            # Out-of-order event: shift later rows down to keep ts sorted
+            i = int(np.searchsorted(self.ts[:self.n], ts_ns, side="right"))
+            for name in self._FIELDS:
+                col = getattr(self, name)
+                col[i + 1:self.n + 1] = col[i:self.n]
+        self.ts[i] = ts_ns
+        self.track_id[i] = track_id
+        self.bbox[i] = bbox
+        self.loc[i] = loc
+        self.n += 1
+
+    def extend(self, records: np.ndarray) -> None:
+        """Append a REC_DTYPE array, re-sorting only if it lands out of order."""
+        m = len(records)
+        if not m:
+            return
+        end = self.n + m
+        if end > len(self.ts):
+            self._grow(max(2 * len(self.ts), end))
+        ts = records["ts"]
+        in_order = (self.n == 0 or ts[0] >= self.ts[self.n - 1]) and bool(np.all(ts[1:] >= ts[:-1]))
+        for name in self._FIELDS:
+            getattr(self, name)[self.n:end] = records[name]
+        self.n = end
+        if not in_order:
+            # stable, so equal timestamps keep insertion order as in append()
+            order = np.argsort(self.ts[:end], kind="stable")
+            for name in self._FIELDS:
+                col = getattr(self, name)
+                col[:end] = col[:end][order]
+
+    def _grow(self, capacity: int) -> None:
+        for name in self._FIELDS:
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def window(self, since_ns: Optional[int] = None, until_ns: Optional[int] = None) -> slice:
+        """Rows with since_ns <= ts <= until_ns (either bound optional), by binary search."""
+        ts = self.ts[:self.n]
+        start = 0 if since_ns is None else int(np.searchsorted(ts, since_ns, side="left"))
+        stop = self.n if until_ns is None else int(np.searchsorted(ts, until_ns, side="right"))
+        return slice(start, max(start, stop))
+
+    def events(self, label: str, rows) -> List[Dict]:
+        """Build sighting dicts for the given row indices (or slice)."""
+        ts = self.ts[rows].tolist()
+        track_ids = self.track_id[rows].tolist()
+        bboxes = self.bbox[rows].tolist()
+        locs = self.loc[rows].tolist()
+        return [
+            {
+                "label": label,
+                "timestamp": ns_to_datetime(t),
+                "track_id": tid,
+                "bbox": tuple(bb),
+                "location": tuple(loc),
+            }
+            for t, tid, bb, loc in zip(ts, track_ids, bboxes, locs)
+        ]
+
+
 class MemoryModule:
     """
     MemoryModule stores and retrieves object sighting events.
 
-    Each sighting is logged to a per-label text file in CSV format:
-        datetime_iso,track_id,x,y,w,h,lat,lon
-    An in-memory cache mirrors these events for fast querying.
+    Each sighting is appended to a per-label binary log `<label>.bin` as a
+    packed REC_DTYPE record:
+        ts_ns:int64, track_id:int32, x,y,w,h:int32, lat,lon:float64
+    Legacy CSV logs (`<label>.txt`) are converted once on load.
+    Log files stay open with a 1 MiB write buffer and are flushed every
+    `flush_every` sightings, on flush()/close(), when the module is
+    garbage-collected, and at interpreter exit.
+    An in-memory cache mirrors these events for fast querying, stored per
+    label as parallel NumPy columns (see _LabelColumns).
     """
 
-    def __init__(self, storage_dir: str = "memory_logs"):
+    def __init__(self, storage_dir: Union[str, os.PathLike] = "memory_logs", flush_every: int = 64):
         """
-        :param storage_dir: Directory where per-object logs are stored.
+        :param storage_dir: Directory where per-object logs are stored (str or path-like).
+        :param flush_every: Flush log files after this many buffered sightings
+                            (1 = flush on every sighting).
         """
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
 
         self._lock = threading.Lock()
-        # label -> List of event dicts
-        self._cache: Dict[str, List[Dict]] = {}
+        # label -> open append handle of its log file
+        self._handles: Dict[str, BinaryIO] = {}
+        self._unflushed = 0
+        # Close the logs when this module is garbage-collected or at interpreter exit,
+        # without the exit hook keeping the module alive
+        weakref.finalize(self, _close_handles, self._handles)
+        # label -> column store of that label's events
+        self._cache: Dict[str, _LabelColumns] = {}
 
         # Load existing logs into cache
         self._load_existing()
 
     def _load_existing(self) -> None:
         for file in self.storage_dir.glob("*.txt"):
-            label = file.stem
-            events: List[Dict] = []
-            with file.open("r", newline="") as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    try:
-                        dt = datetime.datetime.fromisoformat(row[0])
-                        track_id = int(row[1])
-                        x, y, w, h = map(int, row[2:6])
-                        lat, lon = map(float, row[6:8])
-                        events.append({
-                            "label": label,
-                            "timestamp": dt,
-                            "track_id": track_id,
-                            "bbox": (x, y, w, h),
-                            "location": (lat, lon),
-                        })
-                    except Exception:
-                        continue
-            if events:
-                self._cache[label] = events
+            self._migrate_csv(file)
+
+        for file in self.storage_dir.glob("*.bin"):
+            # Ignore a trailing partial record left by an interrupted write
+            count = file.stat().st_size // REC_DTYPE.itemsize
+            records = np.fromfile(file, dtype=REC_DTYPE, count=count)
+            if len(records):
+                self._cache[file.stem] = _LabelColumns.from_records(records)
+
+    def _migrate_csv(self, file: Path) -> None:
+        """Append a legacy CSV log to its binary log, then retire the CSV."""
+        packed = bytearray()
+        with file.open("r", newline="") as f:
+            reader = csv.reader(f)
+            for row in reader:
+                try:
+                    dt = datetime.datetime.fromisoformat(row[0])
+                    track_id = int(row[1])
+                    x, y, w, h = map(int, row[2:6])
+                    lat, lon = map(float, row[6:8])
+                    packed += _REC_STRUCT.pack(datetime_to_ns(dt), track_id, x, y, w, h, lat, lon)
+                except Exception:
+                    continue
+        with file.with_suffix(".bin").open("ab") as f:
+            f.write(packed)
+        file.rename(file.with_name(file.name + ".migrated"))
 
     def store_sighting(self, sighting: Dict) -> None:
         """
@@ -73,21 +224,90 @@ class MemoryModule:
         x, y, w, h = sighting["bbox"]
         lat, lon = sighting.get("location", (0.0, 0.0))
 
-        file_path = self.storage_dir / f"{label}.txt"
+        ts_ns = datetime_to_ns(ts)
         with self._lock:
             # Append to log file
-            with file_path.open("a", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow([ts.isoformat(), track_id, x, y, w, h, lat, lon])
+            f = self._log_handle(label)
+            f.write(_REC_STRUCT.pack(ts_ns, track_id, x, y, w, h, lat, lon))
+            self._unflushed += 1
+            if self._unflushed >= self.flush_every:
+                self._flush_handles()
 
             # Update in-memory cache
-            self._cache.setdefault(label, []).append({
-                "label": label,
-                "timestamp": ts,
-                "track_id": track_id,
-                "bbox": (x, y, w, h),
-                "location": (lat, lon),
-            })
+            cols = self._cache.get(label)
+            if cols is None:
+                cols = self._cache[label] = _LabelColumns()
+            cols.append(ts_ns, track_id, (x, y, w, h), (lat, lon))
+
+    def store_many(self, label: str, records: np.ndarray) -> None:
+        """
+        Store a batch of sightings of one label with a single log write.
+
+        :param label:   Object label shared by all records
+        :param records: REC_DTYPE array (ts in ns since epoch, see datetime_to_ns)
+        """
+        records = np.ascontiguousarray(records, dtype=REC_DTYPE)
+        with self._lock:
+            f = self._log_handle(label)
+            f.write(records.tobytes())
+            self._unflushed += len(records)
+            if self._unflushed >= self.flush_every:
+                self._flush_handles()
+
+            cols = self._cache.get(label)
+            if cols is None:
+                cols = self._cache[label] = _LabelColumns()
+            cols.extend(records)
+
+    def _log_handle(self, label: str) -> BinaryIO:
+        """Open append handle of label's log file, opened on first use."""
+        f = self._handles.get(label)
+        if f is None:
+            file_path = self.storage_dir / f"{label}.bin"
+            f = self._handles[label] = file_path.open("ab", buffering=_LOG_BUFFER_BYTES)
+        return f
+
+    def flush(self) -> None:
+        """Write all buffered sightings to disk."""
+        with self._lock:
+            self._flush_handles()
+
+    def close(self) -> None:
+        """Flush and close all log files (reopened on the next sighting)."""
+        with self._lock:
+            _close_handles(self._handles)
+            self._unflushed = 0
+
+    def _flush_handles(self) -> None:
+        for f in self._handles.values():
+            f.flush()
+        self._unflushed = 0
+
+    def version(self, label: str) -> Tuple[int, int]:
+        """
+        Cheap change marker for a label's history: (event count, latest ns).
+        Changes whenever a sighting of that label is stored.
+        """
+        cols = self._cache.get(label)
+        if cols is None or not cols.n:
+            return (0, 0)
+        return (cols.n, int(cols.ts[cols.n - 1]))
+
+    def get_arrays(self, label: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Column views of a label's history, sorted by time, without building
+        per-event dicts. The arrays are read-only views into the cache.
+
+        :param label: Object label
+        :return: (lat, lon, ts_ns) arrays (empty if no sightings)
+        """
+        cols = self._cache.get(label)
+        if cols is None:
+            cols = _LabelColumns(0)
+        views = (cols.loc[:cols.n, 0], cols.loc[:cols.n, 1], cols.ts[:cols.n])
+        for v in views:
+            v.flags.writeable = False
+        return views
 
     def get_last_seen(self, label: str) -> Optional[Dict]:
         """
@@ -96,36 +316,42 @@ class MemoryModule:
         :param label: Object label
         :return: Sighting dict or None if no sightings
         """
-        events = self._cache.get(label)
-        if not events:
+        cols = self._cache.get(label)
+        if cols is None or not cols.n:
             return None
-        return events[-1]
+        return cols.events(label, [cols.n - 1])[0]
 
     def get_sightings(
         self,
         label: Optional[str] = None,
-        since: Optional[datetime.datetime] = None
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None
     ) -> List[Dict]:
         """
         Retrieve all sighting events, optionally filtered by label and datetime.
 
         :param label: Specific label to filter, or None for all labels
         :param since: Datetime threshold (inclusive)
+        :param until: Datetime upper bound (inclusive)
         :return: List of sighting dicts
         """
+        since_ns = None if since is None else datetime_to_ns(since)
+        until_ns = None if until is None else datetime_to_ns(until)
         results: List[Dict] = []
         labels = [label] if label else list(self._cache.keys())
         for lbl in labels:
-            for ev in self._cache.get(lbl, []):
-                if since is None or ev["timestamp"] >= since:
-                    results.append(ev.copy())
+            cols = self._cache.get(lbl)
+            if cols is None:
+                continue
+            results.extend(cols.events(lbl, cols.window(since_ns, until_ns)))
         return results
 
     def annotate_frame(
         self,
         frame: np.ndarray,
         label: str,
-        event_index: int = -1
+        event_index: int = -1,
+        inplace: bool = False
     ) -> np.ndarray:
         """
         Draw the bounding box of a specified sighting on a copy of the frame.
@@ -133,21 +359,21 @@ class MemoryModule:
         :param frame: Original image
         :param label: Object label
         :param event_index: Index of event to annotate (default latest)
-        :return: Annotated image copy
+        :param inplace: Draw directly on `frame` instead of a copy
+        :return: Annotated image (`frame` itself if inplace)
         """
-        events = self._cache.get(label)
-        if not events:
-            return frame.copy()
+        out = frame if inplace else frame.copy()
+        cols = self._cache.get(label)
+        if cols is None or not cols.n:
+            return out
 
         # Select event
-        try:
-            ev = events[event_index]
-        except IndexError:
-            ev = events[-1]
+        if not -cols.n <= event_index < cols.n:
+            event_index = -1
+        ev = cols.events(label, [event_index % cols.n])[0]
 
         x, y, w, h = ev["bbox"]
         lat, lon = ev["location"]
-        out = frame.copy()
         # Draw bounding box
         cv2.rectangle(out, (x, y), (x + w, y + h), (0, 255, 0), 2)
         # Prepare annotation text
@@ -11,7 +11,7 @@ if __name__ == "__main__":
     script_dir = Path(__file__).parent
     logs_dir = script_dir / "memory_logs_demo"
 
-    mem = MemoryModule(storage_dir=str(logs_dir))
+    mem = MemoryModule(storage_dir=logs_dir)
 
     # Simulate three sightings of "test_object" with locations
     now = datetime.datetime.now()
@@ -53,7 +53,7 @@ if __name__ == "__main__":
 
     # Annotate an empty frame with the latest bounding box and location
     frame = np.zeros((200, 300, 3), dtype=np.uint8)
-    annotated = mem.annotate_frame(frame, "test_object")
+    annotated = mem.annotate_frame(frame, "test_object", inplace=True)
     output_path = script_dir / "annotated_demo.png"
     cv2.imwrite(str(output_path), annotated)
     print(f"Wrote {output_path} with the last bbox and location annotation")
@@ -15,7 +15,7 @@ def main():
     logs_dir = script_dir / "memory_logs_chat_demo"
 
     # Initialize MemoryModule and InferenceModule with manual zones
-    mem = MemoryModule(storage_dir=str(logs_dir))
+    mem = MemoryModule(storage_dir=logs_dir)
     zones = [
         Place("bedside", (37.7749, -122.4194), radius_m=5.0),
         Place("desk",    (37.7755, -122.4185), radius_m=5.0)
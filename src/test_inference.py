@@ -14,7 +14,7 @@ def main():
     logs_dir = script_dir / "memory_logs_inference_demo"
 
     # Initialize MemoryModule (fresh demo)
-    mem = MemoryModule(storage_dir=str(logs_dir))
+    mem = MemoryModule(storage_dir=logs_dir)
 
     # Define manual zones: bedside and desk
     bedside_center = (37.7749, -122.4194)
@@ -67,12 +67,17 @@ def main():
         datetime(2025, 5, 6, 12, 0)   # midday: no data for this bin
     ]
 
-    for tt in test_times:
-        loc = inf.predict_location("test_object", at_time=tt)
+    locs = inf.predict_many("test_object", test_times)
+    for tt, loc in zip(test_times, locs):
         explanation = inf.explain_prediction("test_object", at_time=tt)
         print(f"At {tt.isoformat(' ')} → Predicted location: {loc}")
         print(f"Explanation: {explanation}\n")
 
+    # A label with no sightings yet falls back to the first zone
+    tt = test_times[0]
+    print(f"At {tt.isoformat(' ')} → Predicted 'keys' location: {inf.predict_location('keys', at_time=tt)}")
+    print(f"Explanation: {inf.explain_prediction('keys', at_time=tt)}")
+
 
 if __name__ == "__main__":
     main()